@@ -1,16 +1,24 @@
 import os
-import json
+import orjson
 import time
 import logging
 import cloudscraper
+import requests
 import html
 import re
 import random
 import concurrent.futures
+import hashlib
+import heapq
+import sqlite3
+import threading
 import feedparser
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from email.utils import parsedate_to_datetime
 from urllib.parse import quote, unquote, urlparse, urlunparse
 from datetime import datetime, timedelta, timezone
 from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 from gnews import GNews
 from ddgs import DDGS
 from dateutil import parser
@@ -24,7 +32,8 @@ CONFIG = {
     ],
     'FILES': {
         'NEWS': 'news.json',
-        'MARKET': 'market.json'
+        'MARKET': 'market.json',
+        'CACHE': 'cache.db'
     },
     'TELEGRAM': {
         'BOT_TOKEN': os.environ.get('TG_BOT_TOKEN'), 
@@ -35,9 +44,16 @@ CONFIG = {
     'MAX_WORKERS': 4,
     'POLLINATIONS_KEY': os.environ.get('POLLINATIONS_API_KEY'),
     'AI_RETRIES': 3,
+    'AI_BATCH_SIZE': 6,       # Articles analyzed per AI request
+    'AI_WORKERS': 2,          # Concurrent AI requests (rate-limited API)
+    'RICH_SNIPPET_CHARS': 400, # Feed descriptions longer than this are used instead of scraping
+    'MAX_PAGE_BYTES': 512 * 1024, # Article downloads stop after this many bytes
+    'MAX_ARTICLE_CHARS': 2500, # Scraped text passed to the AI per article
     'MIN_TELEGRAM_URGENCY': 7,
     'MAX_NEWS_AGE_HOURS': 24, # Drop news older than this
-    'HISTORY_SIZE': 300       # Keep last 300 items in history
+    'HISTORY_SIZE': 300,      # Keep last 300 items in history
+    'CACHE_DAYS': 7,          # Forget cached URLs/analyses older than this
+    'CONTENT_KEY_CHARS': 512  # Leading article text hashed to spot republished copies
 }
 
 PROXY_NAMES = [
@@ -47,28 +63,192 @@ PROXY_NAMES = [
     "تهمینه", "گردآفرید", "سهراب", "آتوسا", "رکسانا", "ماندانا"
 ]
 
+AI_SYSTEM_PROMPT = (
+    "You are a Hardline Strategic Analyst aligned with the Iranian nationalist pro-Pahlavi opposition. "
+    "Your tone is firm, uncompromising, and analytically sharp. No diplomatic softness.\n\n"
+
+    "LANGUAGE & TITLE RULES:\n"
+    "- NEVER use honorifics or religious/political prefixes (e.g., Ayatollah, Hojatoleslam, General, Martyr, etc.).\n"
+    "- Refer to officials only by name and position when necessary.\n"
+    "- Do NOT use legitimizing language that implies moral authority.\n\n"
+
+    "STRICT URGENCY SCORE (1-10):\n"
+    "- 9-10: War escalation, direct military confrontation with Israel/USA, death of senior officials, nationwide unrest.\n"
+    "- 7-8: Major sanctions, systemic repression laws, severe currency collapse, confirmed strikes on regime assets.\n"
+    "- 4-6: Strategic diplomatic developments, regional proxy activity, economic instability signals.\n"
+    "- 1-3: Routine political statements, low-impact commentary, minor diplomatic meetings.\n\n"
+
+    "MANDATORY ANALYTICAL FRAMEWORK:\n"
+    "1. SANCTIONS / FOREIGN PRESSURE:\n"
+    "   - Analyze structural weakening effects on regime stability.\n"
+    "   - Evaluate internal economic and political consequences.\n\n"
+
+    "2. RUSSIA / CHINA / NORTH KOREA:\n"
+    "   - If mentioned in the article, frame them as strategic enablers of regime survival.\n"
+    "   - Do NOT insert them if not explicitly referenced.\n\n"
+
+    "3. INTERNAL PROTESTS / ECONOMY:\n"
+    "   - Highlight systemic mismanagement and governance failure.\n"
+    "   - Emphasize public dissatisfaction trends if supported by facts.\n\n"
+
+    "4. REALISM ENFORCEMENT:\n"
+    "   - Do NOT fabricate connections.\n"
+    "   - Do NOT exaggerate beyond available evidence.\n"
+    "   - Stay strictly anchored to verifiable content in the article.\n\n"
+
+    "5. ZERO GENERIC RHETORIC:\n"
+    "   - No repetitive ideological slogans.\n"
+    "   - Each summary must focus specifically on the reported event.\n\n"
+
+    "6. OUTPUT LANGUAGE:\n"
+    "   - Entire output must be in Persian (Farsi).\n\n"
+
+    "JSON STRUCTURE:\n"
+    "{title_fa, summary[3 bullet points], impact(1 sentence), tag(1 word), urgency(integer 1-10), sentiment(-1.0 to 1.0)}"
+)
+
+# Containers whose class hints at the main article text, checked in document order
+ARTICLE_BODY_SELECTOR = ", ".join(
+    f'div[class*="{hint}"]' for hint in ('article', 'story', 'body', 'content', 'entry')
+)
+
+# Hosts every run talks to early on; connections to them are opened ahead of time
+WARMUP_URLS = [
+    'https://alanchand.com', 'https://oilprice.com', 'https://www.bing.com', 'https://news.google.com'
+]
+AI_URL = "https://gen.pollinations.ai/v1/chat/completions"
+
+# Page furniture removed before extracting article text
+CLUTTER_TAGS = ["script", "style", "noscript", "nav", "footer", "header", "aside", "form", "iframe"]
+
+# Charset declarations in a Content-Type header or in the first bytes of a page
+CHARSET_RE = re.compile(rb'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+# Text helpers run for every candidate headline and page, so compile them once
+NON_WORD_RE = re.compile(r'\W+')
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+WHITESPACE_RE = re.compile(r'\s+')
+CODE_FENCE_RE = re.compile(r'```json\s*|```')
+STOP_WORDS = frozenset({'a', 'an', 'the', 'and', 'or', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'news', 'report', 'breaking'})
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger()
 
 class IranNewsRadar:
     def __init__(self):
         self.scraper = cloudscraper.create_scraper(browser='chrome') 
+        # Keep the default number of per-host pools, but let each hold a connection per worker thread
+        for adapter in self.scraper.adapters.values():
+            adapter.init_poolmanager(DEFAULT_POOLSIZE, CONFIG['MAX_WORKERS'] * 4)
         self.api_key = CONFIG['POLLINATIONS_KEY']
+        # The AI endpoint is a single plain JSON API, so it gets its own lean keep-alive session
+        self.ai_session = requests.Session()
+        self.ai_session.headers.update({"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"})
+        self.ai_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=CONFIG['MAX_WORKERS'] * 2))
+        self._warm_connections()
         self.existing_news = self._load_existing_news()
+        self._open_cache()
         
-        self.seen_urls = set()
         self.seen_titles = set()
+        # Token sets of past headlines, computed once instead of on every fuzzy comparison
+        self.history_tokens = []
         
         # Populate history sets
         for item in self.existing_news:
-            if item.get('url'):
-                self.seen_urls.add(self._clean_url(item['url']))
             if item.get('title_en'):
                 self.seen_titles.add(self._normalize_text(item['title_en']))
             if item.get('title_fa'):
                 self.seen_titles.add(self._normalize_text(item['title_fa']))
+            tokens = self._get_tokens(item.get('title_en', item.get('title', '')))
+            if tokens: self.history_tokens.append(tokens)
         
         self.gnews_en = GNews(language='en', country='US', period='4h', max_results=5)
+        # One DDGS client for all searches so its engine instances and HTTP clients are reused
+        self.ddgs = DDGS()
+
+    def _warm_connections(self):
+        """Opens pooled connections to the hot hosts in the background."""
+        def warm(session, url):
+            try: session.head(url, timeout=5).close()
+            except Exception: pass
+
+        warmup = concurrent.futures.ThreadPoolExecutor(max_workers=len(WARMUP_URLS) + 1)
+        if self.api_key:
+            warmup.submit(warm, self.ai_session, "https://" + urlparse(AI_URL).netloc)
+        for url in WARMUP_URLS:
+            warmup.submit(warm, self.scraper, url)
+        warmup.shutdown(wait=False) # Don't block startup on it
+
+    # --- CACHE ---
+    def _open_cache(self):
+        """Opens the on-disk URL/analysis cache and seeds it with the URLs already in news.json."""
+        self.cache_lock = threading.Lock()
+        self.cache = sqlite3.connect(CONFIG['FILES']['CACHE'], check_same_thread=False)
+        self.cache.execute("PRAGMA journal_mode=WAL")
+        self.cache.execute("PRAGMA synchronous=NORMAL")
+        # Each analysis is stored once; seen URLs only point at it
+        self.cache.execute("CREATE TABLE IF NOT EXISTS seen(url TEXT PRIMARY KEY, analysis_key TEXT, ts INTEGER)")
+        # Keyed by content fingerprint, so the same article republished under another URL (AMP, canonical, redirect) matches
+        self.cache.execute("CREATE TABLE IF NOT EXISTS analyses(key TEXT PRIMARY KEY, title TEXT, ai TEXT, ts INTEGER)")
+        try: self.cache.execute("ALTER TABLE analyses ADD COLUMN title TEXT") # Caches written before headlines were stored
+        except sqlite3.OperationalError: pass
+        now = int(time.time())
+        self.cache.executemany(
+            "INSERT OR IGNORE INTO seen(url, analysis_key, ts) VALUES (?, NULL, ?)",
+            [(self._clean_url(item['url']), now) for item in self.existing_news if item.get('url')]
+        )
+        self.cache.commit()
+
+    def _cache_get(self, clean_url):
+        """Returns (analysis_key, ai) for a cached URL, or None if it was never processed."""
+        if not clean_url: return None
+        with self.cache_lock:
+            row = self.cache.execute(
+                "SELECT seen.analysis_key, analyses.ai FROM seen LEFT JOIN analyses ON analyses.key = seen.analysis_key "
+                "WHERE seen.url=?", (clean_url,)
+            ).fetchone()
+        if not row: return None
+        try: ai = orjson.loads(row[1]) if row[1] else None
+        except: ai = None
+        return row[0], ai
+
+    def _content_key(self, text):
+        """Fingerprint of an article's opening text, or None if there is too little text to be distinctive."""
+        if not text or len(text) < CONFIG['CONTENT_KEY_CHARS']: return None
+        return hashlib.sha1(text[:CONFIG['CONTENT_KEY_CHARS']].encode('utf-8')).hexdigest()
+
+    def _cache_get_content(self, content_key, title):
+        """Returns the stored AI analysis for an article fingerprint, or None if there is none or its headline differs."""
+        if not content_key: return None
+        with self.cache_lock:
+            row = self.cache.execute("SELECT title, ai FROM analyses WHERE key=?", (content_key,)).fetchone()
+        if not row: return None
+        # Bot walls and consent pages open the same way on every article; only a shared headline makes it a copy
+        if self._similarity(self._get_tokens(title), self._get_tokens(row[0])) <= 0.2: return None
+        try: return orjson.loads(row[1])
+        except: return None
+
+    def _cache_put(self, clean_urls, analysis_key, title, ai):
+        now = int(time.time())
+        with self.cache_lock:
+            self.cache.execute(
+                "INSERT OR REPLACE INTO analyses(key, title, ai, ts) VALUES (?, ?, ?, ?)",
+                (analysis_key, title, orjson.dumps(ai).decode('utf-8'), now)
+            )
+            self.cache.executemany(
+                "INSERT OR REPLACE INTO seen(url, analysis_key, ts) VALUES (?, ?, ?)",
+                [(u, analysis_key, now) for u in clean_urls if u]
+            )
+            self.cache.commit()
+
+    def close(self):
+        """Drops expired cache rows and closes the database (folding the WAL back into cache.db)."""
+        cutoff = int(time.time()) - CONFIG['CACHE_DAYS'] * 86400
+        with self.cache_lock:
+            self.cache.execute("DELETE FROM seen WHERE ts < ?", (cutoff,))
+            self.cache.execute("DELETE FROM analyses WHERE ts < ?", (cutoff,))
+            self.cache.commit()
+            self.cache.close()
 
     def _clean_url(self, url):
         """Removes query parameters to prevent duplicates based on ?utm_source etc."""
@@ -81,46 +261,72 @@ class IranNewsRadar:
         except:
             return url
 
+    def _decode_html(self, body, content_type=''):
+        """Decodes page bytes using the header or <meta> charset, defaulting to UTF-8."""
+        match = CHARSET_RE.search(content_type.encode('latin-1', 'ignore')) or CHARSET_RE.search(body[:2048])
+        encoding = match.group(1).decode('ascii') if match else 'utf-8'
+        try:
+            return body.decode(encoding, errors='replace')
+        except LookupError:
+            return body.decode('utf-8', errors='replace')
+
+    def _parse_timestamp(self, date_str):
+        """Converts a feed date to an int UTC timestamp, or None if it can't be parsed."""
+        if not date_str: return None
+        try:
+            dt = parsedate_to_datetime(date_str) # RFC 822 (GNews, Bing); ISO 8601 (DDG) next, dateutil last
+        except Exception:
+            try:
+                dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+            except Exception:
+                try: dt = parser.parse(date_str)
+                except: return None
+        if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp())
+
     def _normalize_text(self, text):
         if not text: return ""
-        return re.sub(r'\W+', '', text).lower()
+        return NON_WORD_RE.sub('', text).lower()
 
     def _get_tokens(self, text):
-        stop_words = {'a', 'an', 'the', 'and', 'or', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'news', 'report', 'breaking'}
         if not text: return set()
-        clean = re.sub(r'[^\w\s]', '', text.lower())
+        clean = PUNCTUATION_RE.sub('', text.lower())
         words = set(clean.split())
-        return words - stop_words
+        return words - STOP_WORDS
+
+    def _similarity(self, tokens_a, tokens_b):
+        """Jaccard similarity of two token sets."""
+        intersection = len(tokens_a & tokens_b)
+        union = len(tokens_a) + len(tokens_b) - intersection
+        return intersection / union if union else 0
 
-    def _is_duplicate_fuzzy(self, new_title, comparison_pool):
+    def _is_duplicate_fuzzy(self, new_title, comparison_tokens):
         norm_title = self._normalize_text(new_title)
         if norm_title in self.seen_titles: return True
         
         new_tokens = self._get_tokens(new_title)
         if len(new_tokens) < 3: return False # Too short to judge
 
-        for item in comparison_pool:
-            existing_title = item.get('title_en', item.get('title', ''))
-            existing_tokens = self._get_tokens(existing_title)
-            
-            if not existing_tokens: continue
-            
-            intersection = new_tokens.intersection(existing_tokens)
-            union = new_tokens.union(existing_tokens)
-            
-            if not union: continue
-            similarity = len(intersection) / len(union)
+        for existing_tokens in comparison_tokens:
+            similarity = self._similarity(new_tokens, existing_tokens)
             
             # If 50% similar words, it's a duplicate
             if similarity > 0.5:
                 return True
         return False
 
+    def _write_json(self, path, data, indent=False):
+        """Writes JSON via a temp file so a crash mid-write never leaves a truncated file behind."""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0))
+        os.replace(tmp_path, path)
+
     def _load_existing_news(self):
         if not os.path.exists(CONFIG['FILES']['NEWS']): return []
         try:
-            with open(CONFIG['FILES']['NEWS'], 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(CONFIG['FILES']['NEWS'], 'rb') as f:
+                data = orjson.loads(f.read())
                 return data if isinstance(data, list) else []
         except: return []
 
@@ -140,17 +346,17 @@ class IranNewsRadar:
         try:
             resp = self.scraper.get("https://alanchand.com/en/currencies-price/usd", timeout=10)
             if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                usd = soup.find('input', attrs={'data-curr': 'tmn'})
+                tree = LexborHTMLParser(self._decode_html(resp.content, resp.headers.get('Content-Type', '')))
+                usd = tree.css_first('input[data-curr="tmn"]')
                 if usd:
-                    val = usd.get('data-price') or usd.get('value')
+                    val = usd.attributes.get('data-price') or usd.attributes.get('value')
                     if val: data["usd"] = f"{int(int(val.replace(',', '')) / 10):,}"
         except: pass
         try:
             resp = self.scraper.get("https://oilprice.com/oil-price-charts/46", timeout=10)
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            oil = soup.select_one(".last_price")
-            if oil: data["oil"] = oil.get_text().strip()
+            tree = LexborHTMLParser(self._decode_html(resp.content, resp.headers.get('Content-Type', '')))
+            oil = tree.css_first(".last_price")
+            if oil: data["oil"] = oil.text(strip=True)
         except: pass
         data["updated"] = time.strftime("%H:%M")
         return data
@@ -167,9 +373,8 @@ class IranNewsRadar:
     def fetch_duckduckgo(self, query, region='wt-wt'):
         results = []
         try:
-            ddgs = DDGS()
             # Changed timelimit to 'd' (day)
-            ddg_gen = ddgs.news(query=query, region=region, safesearch="off", timelimit="d", max_results=10)
+            ddg_gen = self.ddgs.news(query=query, region=region, safesearch="off", timelimit="d", max_results=10)
             for r in ddg_gen:
                 results.append({
                     'title': r.get('title'),
@@ -188,7 +393,8 @@ class IranNewsRadar:
         try:
             encoded_query = quote(query)
             url = f"https://www.bing.com/news/search?q={encoded_query}&format=rss"
-            feed = feedparser.parse(url)
+            resp = self.scraper.get(url, timeout=10)
+            feed = feedparser.parse(resp.content)
             
             for entry in feed.entries:
                 publisher = "Bing News"
@@ -227,7 +433,8 @@ class IranNewsRadar:
     def fetch_manual_url(self, url):
         try:
             resp = self.scraper.get(url, timeout=15)
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            # Raw bytes let lxml pick the encoding from the page itself
+            soup = BeautifulSoup(resp.content, 'lxml')
             title = "Unknown Title"
             if soup.title: title = soup.title.string
             og_title = soup.find("meta", property="og:title")
@@ -253,11 +460,9 @@ class IranNewsRadar:
             logger.error(f"Manual Fetch Error: {e}")
             return []
 
-    def get_combined_news(self):
-        all_entries = []
-        all_entries.extend(self.fetch_gnews())
-        all_entries.extend(self.fetch_bing_rss(CONFIG['SEARCH_QUERY']))
-        all_entries.extend(self.fetch_duckduckgo(CONFIG['SEARCH_QUERY'], region='wt-wt'))
+    def fetch_duckduckgo_sources(self):
+        # DDG rate-limits aggressively, so its queries stay sequential within this task
+        all_entries = self.fetch_duckduckgo(CONFIG['SEARCH_QUERY'], region='wt-wt')
         
         # Reduced external sites to prevent timeout, focus on quality
         for domain in CONFIG['TARGET_SOURCES'][:5]: 
@@ -271,6 +476,19 @@ class IranNewsRadar:
             except: pass
         return all_entries
 
+    def get_combined_news(self):
+        # Providers are independent network calls, so query them side by side
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as exc:
+            futures = [
+                exc.submit(self.fetch_gnews),
+                exc.submit(self.fetch_bing_rss, CONFIG['SEARCH_QUERY']),
+                exc.submit(self.fetch_duckduckgo_sources)
+            ]
+        all_entries = []
+        for fut in futures:
+            all_entries.extend(fut.result())
+        return all_entries
+
     # --- PROCESSING ---
     def _resolve_final_url(self, url, raw_title=None):
         if not url: return None
@@ -282,6 +500,8 @@ class IranNewsRadar:
         # 1. Try standard redirect first (sometimes Google lets it through)
         try:
             resp = self.scraper.get(url, allow_redirects=True, timeout=8, stream=True)
+            # Only the final URL is needed; don't download the body
+            resp.close()
             # Make sure we didn't just get redirected to a Google Consent or Error page
             if "news.google.com" not in resp.url and "consent.google.com" not in resp.url:
                 return resp.url
@@ -304,22 +524,68 @@ class IranNewsRadar:
         # Fallback to the original Google URL if everything fails
         return url
 
+    def _read_capped(self, resp):
+        """Reads a streamed response up to MAX_PAGE_BYTES and releases the connection."""
+        limit = CONFIG['MAX_PAGE_BYTES']
+        chunks, total = [], 0
+        try:
+            for chunk in resp.iter_content(64 * 1024):
+                chunks.append(chunk)
+                total += len(chunk)
+                if total >= limit: break
+        finally:
+            resp.close()
+        return b"".join(chunks)[:limit]
+
+    def _iter_paragraphs(self, tree, min_len=60):
+        """Yields substantial <p> texts, stopping once enough text for the AI has been collected."""
+        limit = CONFIG['MAX_ARTICLE_CHARS']
+        total = 0
+        for p in tree.css('p'):
+            text = WHITESPACE_RE.sub(' ', p.text()).strip()
+            if len(text) <= min_len: continue # Captions, bylines, nav links
+            yield text
+            total += len(text) + 1
+            if total >= limit: return
+
     def scrape_article_text(self, final_url, fallback_snippet):
         try:
             if final_url.lower().endswith('.pdf'): return fallback_snippet
-            resp = self.scraper.get(final_url, timeout=15)
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            for tag in soup(["script", "style", "nav", "footer", "header", "form", "iframe"]): tag.extract()
-            article_body = soup.find('div', class_=re.compile(r'(article|story|body|content|entry)'))
+            resp = self.scraper.get(final_url, timeout=15, stream=True)
+            body = self._read_capped(resp)
+            tree = LexborHTMLParser(self._decode_html(body, resp.headers.get('Content-Type', '')))
+            tree.strip_tags(CLUTTER_TAGS)
+            article_body = tree.css_first(ARTICLE_BODY_SELECTOR)
             if article_body:
-                text = article_body.get_text(separator=' ').strip()
+                text = article_body.text(separator=' ').strip()
             else:
-                text = " ".join([p.get_text().strip() for p in soup.find_all('p')])
+                text = " ".join(self._iter_paragraphs(tree))
             
-            clean_text = re.sub(r'\s+', ' ', text)
-            return clean_text[:2500] if len(clean_text) > 100 else fallback_snippet
+            clean_text = WHITESPACE_RE.sub(' ', text)
+            return clean_text[:CONFIG['MAX_ARTICLE_CHARS']] if len(clean_text) > 100 else fallback_snippet
         except: return fallback_snippet
 
+    def _request_ai(self, user_content, timeout=45, max_tokens=None):
+        """Sends one chat completion to Pollinations and returns the decoded JSON reply (raises on HTTP errors)."""
+        payload = {
+            "model": "openai",
+            "messages": [
+                {"role": "system", "content": AI_SYSTEM_PROMPT},
+                {"role": "user", "content": user_content}
+            ],
+            "temperature": 0.25 
+        }
+        if max_tokens: payload["max_tokens"] = max_tokens
+
+        resp = self.ai_session.post(AI_URL, json=payload, timeout=timeout)
+        resp.raise_for_status()
+        raw = resp.json()['choices'][0]['message']['content']
+        clean = CODE_FENCE_RE.sub('', raw).strip()
+        return orjson.loads(clean)
+
+    def _is_valid_analysis(self, data):
+        return isinstance(data, dict) and 'title_fa' in data and 'summary' in data
+
     def analyze_with_ai(self, headline, full_text, source_name):
         if not self.api_key: return None
         
@@ -329,74 +595,14 @@ class IranNewsRadar:
         if is_regime:
             regime_instruction = "CRITICAL: The source is Iranian State Media. Expose propaganda. "
 
-        system_prompt = (
-            "You are a Hardline Strategic Analyst aligned with the Iranian nationalist pro-Pahlavi opposition. "
-            "Your tone is firm, uncompromising, and analytically sharp. No diplomatic softness.\n\n"
-
-            "LANGUAGE & TITLE RULES:\n"
-            "- NEVER use honorifics or religious/political prefixes (e.g., Ayatollah, Hojatoleslam, General, Martyr, etc.).\n"
-            "- Refer to officials only by name and position when necessary.\n"
-            "- Do NOT use legitimizing language that implies moral authority.\n\n"
-
-            "STRICT URGENCY SCORE (1-10):\n"
-            "- 9-10: War escalation, direct military confrontation with Israel/USA, death of senior officials, nationwide unrest.\n"
-            "- 7-8: Major sanctions, systemic repression laws, severe currency collapse, confirmed strikes on regime assets.\n"
-            "- 4-6: Strategic diplomatic developments, regional proxy activity, economic instability signals.\n"
-            "- 1-3: Routine political statements, low-impact commentary, minor diplomatic meetings.\n\n"
-
-            "MANDATORY ANALYTICAL FRAMEWORK:\n"
-            "1. SANCTIONS / FOREIGN PRESSURE:\n"
-            "   - Analyze structural weakening effects on regime stability.\n"
-            "   - Evaluate internal economic and political consequences.\n\n"
-
-            "2. RUSSIA / CHINA / NORTH KOREA:\n"
-            "   - If mentioned in the article, frame them as strategic enablers of regime survival.\n"
-            "   - Do NOT insert them if not explicitly referenced.\n\n"
-
-            "3. INTERNAL PROTESTS / ECONOMY:\n"
-            "   - Highlight systemic mismanagement and governance failure.\n"
-            "   - Emphasize public dissatisfaction trends if supported by facts.\n\n"
-
-            "4. REALISM ENFORCEMENT:\n"
-            "   - Do NOT fabricate connections.\n"
-            "   - Do NOT exaggerate beyond available evidence.\n"
-            "   - Stay strictly anchored to verifiable content in the article.\n\n"
-
-            "5. ZERO GENERIC RHETORIC:\n"
-            "   - No repetitive ideological slogans.\n"
-            "   - Each summary must focus specifically on the reported event.\n\n"
-
-            "6. OUTPUT LANGUAGE:\n"
-            "   - Entire output must be in Persian (Farsi).\n\n"
-
-            "JSON STRUCTURE:\n"
-            "{title_fa, summary[3 bullet points], impact(1 sentence), tag(1 word), urgency(integer 1-10), sentiment(-1.0 to 1.0)}"
-        )
-
         current_text = full_text
 
         for attempt in range(CONFIG['AI_RETRIES']):
             try:
                 if attempt > 0: current_text = headline + " " + full_text[:800]
                 
-                resp = self.scraper.post(
-                    "https://gen.pollinations.ai/v1/chat/completions",
-                    headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
-                    json={
-                        "model": "openai",
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": f"SOURCE: {source_name}\nHEADLINE: {headline}\nTEXT: {current_text}"}
-                        ],
-                        "temperature": 0.25 
-                    }, timeout=45
-                )
-                
-                if resp.status_code == 200:
-                    raw = resp.json()['choices'][0]['message']['content']
-                    clean = re.sub(r'```json\s*|```', '', raw).strip()
-                    data = json.loads(clean)
-                    if 'title_fa' in data and 'summary' in data: return data
+                data = self._request_ai(f"SOURCE: {source_name}\nHEADLINE: {headline}\nTEXT: {current_text}")
+                if self._is_valid_analysis(data): return data
                 time.sleep(1)
             except Exception as e:
                 logger.error(f"AI Attempt {attempt+1} failed: {e}")
@@ -404,7 +610,85 @@ class IranNewsRadar:
 
         return None
 
-    def process_item(self, entry):
+    def analyze_batch_with_ai(self, items):
+        """Analyzes prepared items in one completion; returns analyses aligned with items, or None if the API is down."""
+        if not self.api_key or not items: return [None] * len(items)
+
+        blocks = [
+            f"ID: {i}\nSOURCE: {item['source']}\nHEADLINE: {item['title_en']}\nTEXT: {item['text']}"
+            for i, item in enumerate(items, 1)
+        ]
+        user_content = (
+            f"Analyze each of the following {len(items)} news items independently. "
+            f"Return ONLY a JSON array of {len(items)} objects, each following the JSON STRUCTURE above "
+            f"plus an integer field id copied from the item's ID.\n\nITEMS:\n" + "\n\n".join(blocks)
+        )
+
+        for attempt in range(CONFIG['AI_RETRIES']):
+            try:
+                data = self._request_ai(user_content, timeout=45 + 15 * len(items), max_tokens=800 * len(items))
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                # A 200 reply we can't parse: let the per-item fallback handle these articles
+                logger.warning(f"AI Batch reply was not valid JSON: {e}")
+                return [None] * len(items)
+            except requests.RequestException as e:
+                # Rate limits and outages: retry the whole batch rather than multiplying requests per item
+                logger.error(f"AI Batch attempt {attempt+1} failed: {e}")
+                if attempt + 1 < CONFIG['AI_RETRIES']: time.sleep(2 ** (attempt + 1))
+                continue
+
+            # Models sometimes wrap the array in an object, or return a bare object for a single item
+            if isinstance(data, dict):
+                if self._is_valid_analysis(data):
+                    if len(items) == 1: data.setdefault('id', 1)
+                    data = [data]
+                else: data = next((v for v in data.values() if isinstance(v, list)), [])
+            if not isinstance(data, list): data = []
+
+            # A complete array without ids can only be matched by position
+            if len(data) == len(items) and not any(isinstance(d, dict) and 'id' in d for d in data):
+                return [d if self._is_valid_analysis(d) else None for d in data]
+
+            by_id = {}
+            for d in data:
+                if not self._is_valid_analysis(d): continue
+                try: by_id[int(d.pop('id'))] = d
+                except (KeyError, TypeError, ValueError): pass
+            if len(by_id) < len(items):
+                logger.warning(f"AI Batch matched {len(by_id)} of {len(items)} items.")
+            return [by_id.get(i) for i in range(1, len(items) + 1)]
+
+        return None
+
+    def process_batch(self, batch):
+        """AI stage: analyzes a batch; returns (finished records, items that need a dedicated request)."""
+        analyses = self.analyze_batch_with_ai(batch)
+        if analyses is None:
+            # Nothing was cached, so these articles are picked up again on the next run
+            logger.error(f"AI unavailable; skipping {len(batch)} items this run.")
+            return [], []
+        results, retry = [], []
+        for prepared, ai in zip(batch, analyses):
+            if ai: results.append(self.finish_item(prepared, ai))
+            else: retry.append(prepared)
+        return results, retry
+
+    def process_single(self, prepared):
+        """AI stage fallback for one item the batch reply missed; same return shape as process_batch."""
+        ai = self.analyze_with_ai(prepared['title_en'], prepared['text'], prepared['source'])
+        return ([self.finish_item(prepared, ai)] if ai else []), []
+
+    def finish_item(self, prepared, ai):
+        """Builds the record and caches the analysis under its URLs and content fingerprint."""
+        # Remember both the feed URL and the resolved one so neither is fetched again
+        self._cache_put(
+            {prepared['clean_url'], self._clean_url(prepared['entry'].get('url'))},
+            prepared['content_key'] or "url:" + prepared['clean_url'], prepared['title_en'], ai
+        )
+        return self.build_item(prepared, ai)
+
+    def prepare_item(self, entry):
+        """Resolves, dedups and scrapes an entry. Returns the material for the AI stage or None."""
         # We extract the title and strip publisher names (e.g. " - BBC News") for cleaner Bing searching
         raw_title = entry.get('title', '').rsplit(' - ', 1)[0].strip()
         publisher = entry.get('publisher', {}).get('title', 'Unknown')
@@ -412,40 +696,73 @@ class IranNewsRadar:
         # Pass the raw_title to the resolver to enable the Bing workaround
         final_url = self._resolve_final_url(entry.get('url'), raw_title)
         clean_final_url = self._clean_url(final_url)
+        cached = self._cache_get(clean_final_url)
 
         if not os.environ.get('MANUAL_URL'):
-            if clean_final_url in self.seen_urls:
+            if cached:
                 return None
-            if self._is_duplicate_fuzzy(raw_title, self.existing_news):
+            if self._is_duplicate_fuzzy(raw_title, self.history_tokens):
                 return None
 
         logger.info(f"Processing: {publisher} | {raw_title[:20]}...")
         
         snippet = entry.get('description', raw_title)
         
-        # Now final_url should be a direct website link, allowing scrape_article_text to actually work!
-        text = self.scrape_article_text(final_url, snippet)
-        
-        ai = self.analyze_with_ai(raw_title, text, publisher)
-        if not ai: return None
-        
+        if cached and cached[1]:
+            # Manual re-run of a known URL: reuse the stored analysis without downloading the page again
+            text = snippet
+            content_key, ai = cached
+        else:
+            # Feed descriptions can be HTML (GNews wraps the headline in a long redirect link), so measure the plain text
+            feed_text = WHITESPACE_RE.sub(' ', LexborHTMLParser(snippet).text()).strip() if snippet else ""
+            if len(feed_text) > CONFIG['RICH_SNIPPET_CHARS']:
+                # The feed already gave us enough context; skip the page download and parse
+                text = feed_text
+            else:
+                # Now final_url should be a direct website link, allowing scrape_article_text to actually work!
+                text = self.scrape_article_text(final_url, snippet)
+
+            content_key = self._content_key(text)
+            ai = self._cache_get_content(content_key, raw_title)
+            if ai and not os.environ.get('MANUAL_URL'):
+                # A copy of an article we already published under another URL: remember this URL and drop it
+                logger.info(f"Republished copy, skipping: {raw_title[:20]}...")
+                self._cache_put({clean_final_url, self._clean_url(entry.get('url'))}, content_key, raw_title, ai)
+                return None
+
+        return {
+            "entry": entry,
+            "ai": ai,
+            "content_key": content_key,
+            "title_en": raw_title,
+            "source": publisher,
+            "url": final_url,
+            "clean_url": clean_final_url,
+            "snippet": snippet,
+            "text": text
+        }
+
+    def build_item(self, prepared, ai):
+        """Combines a prepared item with its AI analysis into a news.json record."""
+        entry = prepared['entry']
+        raw_title = prepared['title_en']
+
         try: urgency_val = int(ai.get('urgency', 3))
         except: urgency_val = 3
 
-        try: ts = parser.parse(entry.get('published date')).timestamp()
-        except: ts = time.time()
+        ts = entry.get('timestamp') or self._parse_timestamp(entry.get('published date')) or int(time.time())
 
         return {
             "title_fa": ai.get('title_fa', raw_title),
             "title_en": raw_title,
-            "summary": ai.get('summary', [snippet]),
+            "summary": ai.get('summary', [prepared['snippet']]),
             "impact": ai.get('impact', '...'),
             "tag": ai.get('tag', 'General'),
             "urgency": urgency_val,
             "sentiment": ai.get('sentiment', 0),
-            "source": publisher,
-            "url": final_url, 
-            "clean_url": clean_final_url, 
+            "source": prepared['source'],
+            "url": prepared['url'], 
+            "clean_url": prepared['clean_url'], 
             "image": entry.get('image'),
             "timestamp": ts
         }
@@ -457,7 +774,7 @@ class IranNewsRadar:
 
         # 1. Fetch Market Data
         try:
-            with open(CONFIG['FILES']['MARKET'], 'r') as f: mkt = json.load(f)
+            with open(CONFIG['FILES']['MARKET'], 'rb') as f: mkt = orjson.loads(f.read())
             market_text = f"💵 <b>دلار:</b> {mkt.get('usd')} | 🛢 <b>نفت:</b> {mkt.get('oil')}"
         except: market_text = ""
 
@@ -568,8 +885,7 @@ class IranNewsRadar:
 
         # --- PART D: Send Messages ---
         api_url = f"https://api.telegram.org/bot{token}/sendMessage"
-        sc = cloudscraper.create_scraper()
-        
+
         for msg in messages_to_send:
             payload = {
                 "chat_id": chat_id, 
@@ -579,7 +895,7 @@ class IranNewsRadar:
             }
             
             try:
-                sc.post(api_url, json=payload)
+                self.scraper.post(api_url, json=payload, timeout=CONFIG['TIMEOUT'])
                 time.sleep(1.5)
             except Exception as e:
                 logger.error(f"TG Send Error: {e}")
@@ -587,26 +903,22 @@ class IranNewsRadar:
     def save_news(self, new_items):
         """Merges new items with old items and saves to file safely."""
         try:
-            # Combine
-            all_news = new_items + self.existing_news
+            # news.json is stored newest-first, so only the new batch needs sorting before a merge
+            by_time = lambda x: x.get('timestamp', 0)
+            new_sorted = sorted(new_items, key=by_time, reverse=True)
+            all_news = heapq.merge(new_sorted, self.existing_news, key=by_time, reverse=True)
             
-            # Remove strict duplicates based on URL
+            # Remove strict duplicates based on URL, stopping once the history is full
             seen_u = set()
-            unique_news = []
+            final_list = []
             for item in all_news:
                 u = self._clean_url(item.get('url'))
                 if u and u not in seen_u:
                     seen_u.add(u)
-                    unique_news.append(item)
-            
-            # Sort by timestamp desc
-            unique_news.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+                    final_list.append(item)
+                    if len(final_list) >= CONFIG['HISTORY_SIZE']: break
             
-            # Trim history
-            final_list = unique_news[:CONFIG['HISTORY_SIZE']]
-            
-            with open(CONFIG['FILES']['NEWS'], 'w', encoding='utf-8') as f: 
-                json.dump(final_list, f, indent=4, ensure_ascii=False)
+            self._write_json(CONFIG['FILES']['NEWS'], final_list, indent=True)
             
             logger.info(">>> news.json updated successfully.")
             return final_list
@@ -618,8 +930,7 @@ class IranNewsRadar:
         logger.info(">>> Radar Started...")
         
         # Update Market Data
-        with open(CONFIG['FILES']['MARKET'], 'w') as f: 
-            json.dump(self.fetch_market_rates(), f)
+        self._write_json(CONFIG['FILES']['MARKET'], self.fetch_market_rates())
 
         manual_url = os.environ.get('MANUAL_URL')
         
@@ -633,30 +944,26 @@ class IranNewsRadar:
             candidates = []
             seen_batch_titles = set()
             
-            cutoff_date = datetime.now(timezone.utc) - timedelta(hours=CONFIG['MAX_NEWS_AGE_HOURS'])
+            cutoff_ts = time.time() - CONFIG['MAX_NEWS_AGE_HOURS'] * 3600
             
             for item in results:
-                # 1. Check Date
-                try:
-                    p_date = item.get('published date')
-                    if p_date:
-                        dt = parser.parse(p_date)
-                        # Make naive datetime aware (assume UTC if missing)
-                        if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
-                        if dt < cutoff_date: continue # SKIP OLD NEWS
-                except: pass # If date parse fails, assume recent
+                # 1. Check Date (parsed once here and carried along for build_item)
+                ts = self._parse_timestamp(item.get('published date'))
+                if ts is not None: # If date parse fails, assume recent
+                    if ts < cutoff_ts: continue # SKIP OLD NEWS
+                    item['timestamp'] = ts
 
                 # 2. Check Deduplication
                 raw_url = item.get('url', '')
                 clean_u = self._clean_url(raw_url)
-                if clean_u in self.seen_urls: continue
+                if self._cache_get(clean_u): continue
 
                 t = item.get('title', '').rsplit(' - ', 1)[0]
                 norm_t = self._normalize_text(t)
                 
                 if norm_t in self.seen_titles: continue
                 if norm_t in seen_batch_titles: continue
-                if self._is_duplicate_fuzzy(t, self.existing_news): continue
+                if self._is_duplicate_fuzzy(t, self.history_tokens): continue
 
                 seen_batch_titles.add(norm_t)
                 candidates.append(item)
@@ -666,14 +973,42 @@ class IranNewsRadar:
         # --- 2. PROCESSING ---
         new_processed_items = []
         if candidates:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=CONFIG['MAX_WORKERS']) as exc:
-                futures = {exc.submit(self.process_item, i): i for i in candidates}
-                for fut in concurrent.futures.as_completed(futures):
-                    res = fut.result()
-                    if res:
-                        new_processed_items.append(res)
-                        # Add to seen immediately so we don't double process if logic expands
-                        self.seen_urls.add(res['clean_url'])
+            # Two-stage pipeline: scraped items are handed to the AI workers while other pages are still downloading
+            batch_size = CONFIG['AI_BATCH_SIZE']
+            batch_urls = set()
+            pending = []
+            with concurrent.futures.ThreadPoolExecutor(max_workers=CONFIG['AI_WORKERS']) as ai_exc:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=CONFIG['MAX_WORKERS']) as exc:
+                    scrape_futures = {exc.submit(self.prepare_item, i) for i in candidates}
+                    ai_futures = set()
+                    while scrape_futures or ai_futures:
+                        done, _ = concurrent.futures.wait(
+                            scrape_futures | ai_futures, return_when=concurrent.futures.FIRST_COMPLETED
+                        )
+                        for fut in done:
+                            if fut in ai_futures:
+                                ai_futures.discard(fut)
+                                results, retry = fut.result()
+                                new_processed_items.extend(results)
+                                # Fallbacks go back to the AI pool so they run side by side
+                                ai_futures.update(ai_exc.submit(self.process_single, p) for p in retry)
+                                continue
+
+                            scrape_futures.discard(fut)
+                            prepared = fut.result()
+                            # Two sources resolving to the same article should only be analyzed once
+                            if not prepared or prepared['clean_url'] in batch_urls: continue
+                            batch_urls.add(prepared['clean_url'])
+
+                            if prepared['ai']:
+                                new_processed_items.append(self.finish_item(prepared, prepared['ai']))
+                            else:
+                                pending.append(prepared)
+
+                        # Send a batch once it is full; the remainder goes out when scraping has finished
+                        while pending and (len(pending) >= batch_size or not scrape_futures):
+                            ai_futures.add(ai_exc.submit(self.process_batch, pending[:batch_size]))
+                            pending = pending[batch_size:]
 
         # --- 3. SAVING & SENDING ---
         if new_processed_items:
@@ -703,4 +1038,6 @@ class IranNewsRadar:
             logger.info(">>> No valid new items found.")
 
 if __name__ == "__main__":
-    IranNewsRadar().run()
+    radar = IranNewsRadar()
+    try: radar.run()
+    finally: radar.close()